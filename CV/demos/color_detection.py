@@ -8,6 +8,7 @@ Features:
 - Convert frames to HSV
 - Use trackbars to dynamically adjust HSV min/max values
 - Apply mask and display result
+- HSV, mask and result images are reused from a buffer pool (no per-frame allocations)
 
 Run:
     python color_detection.py
@@ -20,6 +21,8 @@ Requirements:
 import cv2 as cv
 import numpy as np
 
+from frame_buffers import BufferPool
+
 
 def get_webcam():
     cam = cv.VideoCapture(0, cv.CAP_DSHOW)
@@ -47,16 +50,26 @@ def create_trackbars():
 def run_demo():
     cam = get_webcam()
     create_trackbars()
+    pool = BufferPool()
+    frame = None
+    lower = np.zeros(3, np.uint8)
+    upper = np.zeros(3, np.uint8)
 
     print("Adjust the HSV trackbars. Press 'q' to quit.")
 
     while True:
-        success, frame = cam.read()
+        pool.begin_frame()
+        # passing the previous frame lets VideoCapture decode into the same buffer
+        success, frame = cam.read(frame)
         if not success:
             print("Error reading frame from webcam")
             break
 
-        hsv = cv.cvtColor(frame, cv.COLOR_BGR2HSV)
+        hsv = pool.like('hsv', frame)
+        mask = pool.get('mask', frame.shape[:2])
+        result = pool.like('result', frame)
+
+        cv.cvtColor(frame, cv.COLOR_BGR2HSV, dst=hsv)
 
         h_min = cv.getTrackbarPos('Hue min','Trackbars')
         h_max = cv.getTrackbarPos('Hue max','Trackbars')
@@ -65,19 +78,24 @@ def run_demo():
         v_min = cv.getTrackbarPos('Val min','Trackbars')
         v_max = cv.getTrackbarPos('Val max','Trackbars')
 
-        lower = np.array([h_min, s_min, v_min])
-        upper = np.array([h_max, s_max, v_max])
+        lower[:] = (h_min, s_min, v_min)
+        upper[:] = (h_max, s_max, v_max)
 
-        mask = cv.inRange(hsv, lower, upper)
-        result = cv.bitwise_and(frame, frame, mask=mask)
+        cv.inRange(hsv, lower, upper, dst=mask)
+        # bitwise_and leaves masked-out pixels of dst untouched, so clear it first
+        result.fill(0)
+        cv.bitwise_and(frame, frame, dst=result, mask=mask)
 
         cv.imshow('Original', frame)
         cv.imshow('Mask', mask)
         cv.imshow('Result', result)
 
+        pool.end_frame()
+
         if cv.waitKey(1) & 0xFF == ord('q'):
             break
 
+    print(pool.format_stats())
     cam.release()
     cv.destroyAllWindows()
 
@@ -0,0 +1,351 @@
+"""
+detection_log.py
+
+Helper: compact columnar log of detections for long-running sessions.
+
+Features:
+- Detections (timestamp, stream, class, x, y, w, h, frame index) are packed
+  into fixed-size chunks of a NumPy structured array and saved as .npy files
+- Stream and class names are stored once in index.json and referenced by id
+- Writing happens on a background thread, so the frame loop never blocks on disk
+- Several writers (e.g. the face and plate demos) can share one log directory:
+  chunk files get a per-writer prefix and the index is merged under a lock file
+- Every writer keeps one open chunk: it is re-saved under the same file name
+  (and its single index entry updated) every few seconds until it holds
+  CHUNK_ROWS rows, so a crash loses little, readers see recent detections, and
+  a long session still produces only a few large chunk files
+- Reading memory-maps the chunks and answers time-range / per-stream queries,
+  skipping whole chunks by their time range and stream set
+
+Usage:
+    from detection_log import DetectionWriter, DetectionLog
+
+    writer = DetectionWriter('logs/session1')
+    writer.log('cam0', 'face', faces, frame_idx)   # from the frame loop
+    writer.close()
+
+    log = DetectionLog('logs/session1')
+    rows = log.query(t0, t1, stream='cam0', cls='face')
+    print(rows['x'], rows['timestamp'])
+
+Requirements:
+    - numpy
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+import numpy as np
+
+DETECTION_DTYPE = np.dtype([
+    ('timestamp', '<f8'),   # seconds since the epoch
+    ('stream', '<u2'),      # id into index['streams']
+    ('cls', '<u2'),         # id into index['classes']
+    ('x', '<i4'),
+    ('y', '<i4'),
+    ('w', '<i4'),
+    ('h', '<i4'),
+    ('frame', '<u8'),
+])
+
+INDEX_NAME = 'index.json'
+LOCK_NAME = 'index.lock'
+CHUNK_ROWS = 65536      # ~2.5 MB per chunk
+FLUSH_INTERVAL = 5.0    # seconds between flushes of a partial chunk
+
+
+def _write_json(path, data):
+    """Write JSON atomically so readers never see a half-written index."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _save_npy(path, arr):
+    """Save an array atomically; open chunks are re-saved while readers may load them."""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+class _IndexLock:
+    """
+    Cross-process lock on a log directory's index, based on an exclusively created lock file.
+
+    A lock file older than `stale_after` seconds is assumed to be left over
+    from a crashed writer and is removed.
+    """
+
+    def __init__(self, log_dir, timeout=10.0, stale_after=30.0):
+        self.path = os.path.join(log_dir, LOCK_NAME)
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self._fd = None
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                self._fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue  # released in the meantime
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"could not lock {self.path}")
+                time.sleep(0.005)
+
+    def __exit__(self, *exc):
+        os.close(self._fd)
+        os.remove(self.path)
+
+
+def _read_index(log_dir):
+    path = os.path.join(log_dir, INDEX_NAME)
+    if not os.path.exists(path):
+        return {'streams': [], 'classes': [], 'chunks': []}
+    with open(path) as f:
+        return json.load(f)
+
+
+# ---------------------------
+# Writer
+# ---------------------------
+
+class DetectionWriter:
+    """
+    Append detections to a log directory from a background thread.
+
+    log() only puts the boxes on a queue; if the queue is full the batch is
+    dropped (and counted in `dropped`) rather than stalling the caller.
+
+    Rows are collected with writer-local stream/class ids. On every flush the
+    index is re-read under a lock, the local names are mapped to the shared ids,
+    and the chunk (sorted by timestamp) is saved under a per-writer file name,
+    so several writers can log to the same directory.
+
+    A chunk stays open (flagged 'open' in the index) until it holds
+    `chunk_rows` rows or the writer is closed: periodic flushes re-save it
+    under the same name and replace its index entry instead of adding files.
+
+    Args:
+        log_dir (str): directory for the chunks and index (created if missing)
+        chunk_rows (int): maximum rows per chunk file
+        max_pending (int): maximum number of queued log() calls
+        flush_interval (float): seconds after which a partial chunk is flushed
+    """
+
+    def __init__(self, log_dir, chunk_rows=CHUNK_ROWS, max_pending=1024, flush_interval=FLUSH_INTERVAL):
+        os.makedirs(log_dir, exist_ok=True)
+        self.log_dir = log_dir
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.rows_written = 0
+
+        self._prefix = f"{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        self._chunks_written = 0  # sequence number of the open chunk
+        self._saved = 0           # rows of the open chunk already on disk
+        self._streams = []  # writer-local id -> name
+        self._classes = []
+        self._buf = np.zeros(chunk_rows, DETECTION_DTYPE)
+        self._n = 0
+        self._last_flush = time.monotonic()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name='DetectionWriter', daemon=True)
+        self._thread.start()
+
+    # called from the frame loop
+
+    def log(self, stream, cls, boxes, frame_idx, timestamp=None):
+        """Queue the (x, y, w, h) boxes detected in one frame. Never blocks."""
+        if len(boxes) == 0:
+            return
+        if timestamp is None:
+            timestamp = time.time()
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        try:
+            self._queue.put_nowait((stream, cls, boxes, frame_idx, timestamp))
+        except queue.Full:
+            self.dropped += len(boxes)
+
+    def close(self):
+        """Flush everything still queued and the partial chunk, then stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
+        self._flush(final=True)
+
+    # background thread
+
+    @staticmethod
+    def _local_id(names, name):
+        if name not in names:
+            names.append(name)
+        return names.index(name)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+            if item is None:
+                break
+            if not item:
+                continue
+            stream, cls, boxes, frame_idx, timestamp = item
+            stream_id = self._local_id(self._streams, stream)
+            cls_id = self._local_id(self._classes, cls)
+            start = 0
+            while start < len(boxes):
+                n = min(len(boxes) - start, self.chunk_rows - self._n)
+                rows = self._buf[self._n:self._n + n]
+                part = boxes[start:start + n]
+                rows['timestamp'] = timestamp
+                rows['stream'] = stream_id
+                rows['cls'] = cls_id
+                rows['x'], rows['y'], rows['w'], rows['h'] = part[:, 0], part[:, 1], part[:, 2], part[:, 3]
+                rows['frame'] = frame_idx
+                self._n += n
+                start += n
+                if self._n == self.chunk_rows:
+                    self._flush()
+
+    def _flush(self, final=False):
+        self._last_flush = time.monotonic()
+        if self._n == 0 or (self._n == self._saved and not final):
+            return
+        full = self._n == self.chunk_rows
+        # time.time() can step backwards and callers may pass their own timestamps,
+        # so sort here; readers rely on sorted chunks for searchsorted
+        rows = self._buf[:self._n]
+        rows = rows[np.argsort(rows['timestamp'], kind='stable')]
+
+        with _IndexLock(self.log_dir):
+            index = _read_index(self.log_dir)
+            stream_map = np.array([self._local_id(index['streams'], n) for n in self._streams], np.uint16)
+            cls_map = np.array([self._local_id(index['classes'], n) for n in self._classes], np.uint16)
+            rows['stream'] = stream_map[rows['stream']]
+            rows['cls'] = cls_map[rows['cls']]
+
+            name = f"chunk_{self._prefix}_{self._chunks_written:06d}.npy"
+            _save_npy(os.path.join(self.log_dir, name), rows)
+            meta = {
+                'file': name,
+                'rows': int(self._n),
+                't_min': float(rows['timestamp'][0]),
+                't_max': float(rows['timestamp'][-1]),
+                'streams': sorted(int(v) for v in np.unique(rows['stream'])),
+                'open': not (full or final),
+            }
+            # replace the entry of the open chunk if an earlier flush added it
+            chunks = [c for c in index['chunks'] if c['file'] != name]
+            index['chunks'] = chunks + [meta]
+            _write_json(os.path.join(self.log_dir, INDEX_NAME), index)
+
+        self.rows_written += self._n - self._saved
+        self._saved = self._n
+        if full:
+            self._chunks_written += 1
+            self._n = self._saved = 0
+
+
+# ---------------------------
+# Reader
+# ---------------------------
+
+class DetectionLog:
+    """
+    Read-only, memory-mapped view of a detection log directory.
+
+    Args:
+        log_dir (str): directory written by DetectionWriter
+    """
+
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self.reload()
+
+    def reload(self):
+        """Re-read the index (picks up chunks flushed since the log was opened)."""
+        self.index = _read_index(self.log_dir)
+        self._chunks = {}
+
+    @property
+    def streams(self):
+        return list(self.index['streams'])
+
+    @property
+    def classes(self):
+        return list(self.index['classes'])
+
+    def __len__(self):
+        return sum(c['rows'] for c in self.index['chunks'])
+
+    def _chunk(self, meta):
+        if meta.get('open'):
+            # its writer still re-saves this chunk, so read the current version instead of caching a map
+            return np.load(os.path.join(self.log_dir, meta['file']))
+        arr = self._chunks.get(meta['file'])
+        if arr is None:
+            arr = np.load(os.path.join(self.log_dir, meta['file']), mmap_mode='r')
+            self._chunks[meta['file']] = arr
+        return arr
+
+    def query(self, t0=None, t1=None, stream=None, cls=None):
+        """
+        Return detections with t0 <= timestamp < t1, optionally for one stream / class.
+
+        Rows are sorted by time within each chunk, but the result is the chunks
+        concatenated in index order, so it is not sorted by time across chunks
+        or writers; use np.sort(rows, order='timestamp') when order matters.
+
+        Returns:
+            np.ndarray: structured array with DETECTION_DTYPE fields (a copy)
+        """
+        t0 = -np.inf if t0 is None else t0
+        t1 = np.inf if t1 is None else t1
+        stream_id = self._lookup('streams', stream)
+        cls_id = self._lookup('classes', cls)
+        if stream_id == -1 or cls_id == -1:
+            return np.zeros(0, DETECTION_DTYPE)
+
+        parts = []
+        for meta in self.index['chunks']:
+            if meta['t_max'] < t0 or meta['t_min'] >= t1:
+                continue
+            if stream_id is not None and stream_id not in meta['streams']:
+                continue
+            rows = self._chunk(meta)
+            ts = rows['timestamp']
+            # writers sort every chunk by timestamp before saving it
+            lo, hi = np.searchsorted(ts, t0, 'left'), np.searchsorted(ts, t1, 'left')
+            rows = rows[lo:hi]
+            if stream_id is not None:
+                rows = rows[rows['stream'] == stream_id]
+            if cls_id is not None:
+                rows = rows[rows['cls'] == cls_id]
+            if len(rows):
+                parts.append(np.asarray(rows))
+        if not parts:
+            return np.zeros(0, DETECTION_DTYPE)
+        return np.concatenate(parts)
+
+    def _lookup(self, table, name):
+        """Name -> id; None means no filter, -1 means an unknown name (no matches)."""
+        if name is None:
+            return None
+        names = self.index[table]
+        return names.index(name) if name in names else -1
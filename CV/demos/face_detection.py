@@ -8,9 +8,13 @@ Features:
 - Convert frames to grayscale
 - Detect faces using pre-trained Haar Cascade
 - Draw rectangles around detected faces
+- Optionally log every detection to a columnar detection log (--log DIR)
+- Tiled mode for high-resolution cameras: overlapping tiles detected in parallel (--tiled)
 
 Run:
     python face_detection.py
+    python face_detection.py --log logs/session1 [--stream cam0]
+    python face_detection.py --tiled [--max-object 256]
 
 Requirements:
     - OpenCV (cv2)
@@ -18,9 +22,13 @@ Requirements:
     - Xmls/haarcascade_frontalface_default.xml (Haar Cascade file)
 """
 
+import argparse
 import cv2 as cv
 import os
 
+from detection_log import DetectionWriter
+from tiled_detection import TiledDetector
+
 
 def get_webcam():
     """Initialize webcam capture."""
@@ -31,15 +39,27 @@ def get_webcam():
     return cam
 
 
-def run_demo():
+def detect_faces(gray, face_cas, scale_factor=1.1, min_neighbors=4):
+    """Return face boxes (x, y, w, h) found in a grayscale image."""
+    return face_cas.detectMultiScale(gray, scale_factor, min_neighbors)
+
+
+def run_demo(log_dir=None, stream='cam0', tiled=False, max_object=256):
     # Load Haar cascade for face detection
     face_cascade_path = os.path.join('Xmls', 'haarcascade_frontalface_default.xml')
     if not os.path.exists(face_cascade_path):
         print(f"Haar cascade not found: {face_cascade_path}")
         return
-    face_cas = cv.CascadeClassifier(face_cascade_path)
+    if tiled:
+        # same interface as CascadeClassifier, but runs overlapping tiles in a thread pool
+        face_cas = TiledDetector(face_cascade_path, max_object=max_object)
+    else:
+        face_cas = cv.CascadeClassifier(face_cascade_path)
 
     cam = get_webcam()
+    # detections are handed to a background writer so logging never blocks the loop
+    writer = DetectionWriter(log_dir) if log_dir else None
+    frame_idx = 0
 
     print("Press 'q' to quit")
 
@@ -50,7 +70,10 @@ def run_demo():
             break
 
         gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
-        faces = face_cas.detectMultiScale(gray, 1.1, 4)
+        faces = detect_faces(gray, face_cas)
+        if writer:
+            writer.log(stream, 'face', faces, frame_idx)
+        frame_idx += 1
 
         for (x, y, w, h) in faces:
             cv.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
@@ -62,7 +85,22 @@ def run_demo():
 
     cam.release()
     cv.destroyAllWindows()
+    if tiled:
+        face_cas.close()
+    if writer:
+        writer.close()
+        print(f"Logged {writer.rows_written} detections to {log_dir} (dropped {writer.dropped})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Face detection demo')
+    parser.add_argument('--log', metavar='DIR', help='append detections to a detection log directory')
+    parser.add_argument('--stream', default='cam0', help='stream name stored with each detection')
+    parser.add_argument('--tiled', action='store_true', help='detect on overlapping tiles in parallel')
+    parser.add_argument('--max-object', type=int, default=256, help='largest expected face size in pixels (--tiled)')
+    args = parser.parse_args()
+    run_demo(log_dir=args.log, stream=args.stream, tiled=args.tiled, max_object=args.max_object)
 
 
 if __name__ == '__main__':
-    run_demo()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""
+frame_buffers.py
+
+Helper: reusable frame buffers for the interactive demo loops.
+
+Features:
+- Pool of preallocated arrays keyed by name, reused across frames
+- Buffers are only (re)allocated when the requested shape or dtype changes
+- Optional per-frame allocation counter based on tracemalloc, exposed via stats()
+
+Usage:
+    from frame_buffers import BufferPool
+
+    pool = BufferPool()
+    while True:
+        pool.begin_frame()
+        hsv = pool.get('hsv', frame.shape)
+        cv.cvtColor(frame, cv.COLOR_BGR2HSV, dst=hsv)
+        ...
+        pool.end_frame()
+    print(pool.format_stats())
+
+Notes:
+    - Allocation tracking hooks every Python allocation, so it is off by default.
+      Set CV_POOL_STATS=1 (or pass track_allocations=True) to enable it.
+
+Requirements:
+    - numpy
+"""
+
+import os
+import tracemalloc
+
+import numpy as np
+
+# Anything at or above this size counts as a "large" (frame sized) allocation.
+# A 640x480 mask is ~300 KB, so 64 KB leaves plenty of room for small temporaries.
+LARGE_ALLOC_BYTES = 64 * 1024
+
+# Opt-in switch for the tracemalloc based counter used when track_allocations is None
+TRACK_ALLOCATIONS = os.environ.get('CV_POOL_STATS', '') not in ('', '0')
+
+
+class BufferPool:
+    """
+    Named pool of reusable numpy buffers with a per-frame allocation counter.
+
+    Args:
+        track_allocations (bool, optional): start tracemalloc and count frames in
+            which more than LARGE_ALLOC_BYTES were allocated between begin_frame()
+            and end_frame(); defaults to the CV_POOL_STATS environment variable
+        large_alloc_bytes (int): threshold for a "large" allocation
+    """
+
+    def __init__(self, track_allocations=None, large_alloc_bytes=LARGE_ALLOC_BYTES):
+        self._buffers = {}
+        self.large_alloc_bytes = large_alloc_bytes
+        self.hits = 0
+        self.misses = 0
+        self.frames = 0
+        self.large_alloc_frames = 0
+        self.last_frame_bytes = 0
+        self.max_frame_bytes = 0
+
+        self._track = TRACK_ALLOCATIONS if track_allocations is None else track_allocations
+        self._owns_tracing = False
+        self._frame_base = None
+        if self._track and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+
+    # ---------------------------
+    # Buffers
+    # ---------------------------
+
+    def get(self, name, shape, dtype=np.uint8):
+        """Return the buffer called `name`, allocating it only if shape/dtype changed."""
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype)
+            self._buffers[name] = buf
+            self.misses += 1
+        else:
+            self.hits += 1
+        return buf
+
+    def get_rows(self, name, rows, row_shape, dtype=np.uint8):
+        """
+        Return a (rows, *row_shape) view of a pooled stack for per-frame variable counts.
+
+        The underlying buffer only grows, so frames with fewer rows reuse it.
+        """
+        row_shape = tuple(row_shape)
+        dtype = np.dtype(dtype)
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape[1:] != row_shape or buf.dtype != dtype or len(buf) < rows:
+            buf = np.empty((max(rows, 1),) + row_shape, dtype)
+            self._buffers[name] = buf
+            self.misses += 1
+        else:
+            self.hits += 1
+        return buf[:rows]
+
+    def like(self, name, arr):
+        """Return a pooled buffer with the same shape and dtype as `arr`."""
+        return self.get(name, arr.shape, arr.dtype)
+
+    def copy_into(self, name, src):
+        """Copy `src` into the pooled buffer `name` (allocation-free replacement for src.copy())."""
+        dst = self.like(name, src)
+        np.copyto(dst, src)
+        return dst
+
+    # ---------------------------
+    # Allocation counter
+    # ---------------------------
+
+    def begin_frame(self):
+        """Mark the start of a frame for the allocation counter."""
+        if not self._track:
+            return
+        tracemalloc.reset_peak()
+        self._frame_base = tracemalloc.get_traced_memory()[0]
+
+    def end_frame(self):
+        """Mark the end of a frame and update the allocation counters."""
+        self.frames += 1
+        if not self._track or self._frame_base is None:
+            return
+        _, peak = tracemalloc.get_traced_memory()
+        frame_bytes = max(0, peak - self._frame_base)
+        self.last_frame_bytes = frame_bytes
+        self.max_frame_bytes = max(self.max_frame_bytes, frame_bytes)
+        if frame_bytes >= self.large_alloc_bytes:
+            self.large_alloc_frames += 1
+        self._frame_base = None
+
+    def stats(self):
+        """Return pool and allocation statistics as a dict."""
+        return {
+            'buffers': len(self._buffers),
+            'pool_bytes': sum(b.nbytes for b in self._buffers.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+            'frames': self.frames,
+            'tracking': self._track,
+            'large_alloc_frames': self.large_alloc_frames,
+            'last_frame_bytes': self.last_frame_bytes,
+            'max_frame_bytes': self.max_frame_bytes,
+        }
+
+    def format_stats(self):
+        """Return stats() as a single human readable line."""
+        s = self.stats()
+        line = (f"[pool] buffers={s['buffers']} ({s['pool_bytes'] / 1e6:.1f} MB) "
+                f"hits={s['hits']} misses={s['misses']} frames={s['frames']} ")
+        if not s['tracking']:
+            return line + "allocation tracking off (set CV_POOL_STATS=1)"
+        return line + (f"large-alloc frames={s['large_alloc_frames']} "
+                       f"max frame alloc={s['max_frame_bytes'] / 1e3:.1f} KB")
+
+    def close(self):
+        """Release all buffers and stop tracemalloc if this pool started it."""
+        self._buffers.clear()
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
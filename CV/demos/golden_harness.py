@@ -0,0 +1,456 @@
+"""
+golden_harness.py
+
+Tool: golden-output regression harness for the demo algorithms.
+
+Features:
+- Runs the core demo functions headlessly on the bundled Resources/ images:
+  shape recognition, face and plate cascades, color_detect, warp_perspective,
+  find_document_corners, create_grid
+- Records golden outputs (boxes, shape labels, image hashes + thumbnails)
+- Compares the baseline and any registered fast path against the goldens
+- Reports accuracy deltas next to timing so an optimization can be accepted
+  or rejected in one run
+
+Run (from the CV/ folder):
+    python demos/golden_harness.py --record        # write golden/golden.json
+    python demos/golden_harness.py                 # compare all variants
+    python demos/golden_harness.py --case shapes --repeat 20
+    python demos/golden_harness.py --pack Resources.pack   # read pre-decoded images
+
+Notes:
+    - Fast paths are registered with register_variant(case, name, fn); fn takes
+      the same prepared inputs as the baseline and returns the same kind of output.
+    - Image outputs are compared through a 16x16 grayscale thumbnail so tiny
+      interpolation differences stay within tolerance; the exact sha256 is reported too.
+    - The goldens are committed in golden/golden.json; re-record them only when an
+      intended change of the baseline output has been reviewed.
+    - Resources/ has no license plate image, so the plate golden is empty: the
+      case guards against plate false positives (any detection is a FAIL).
+
+Requirements:
+    - OpenCV (cv2)
+    - numpy
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import cv2 as cv
+import numpy as np
+
+import face_detection
+import grid_display_demo
+import perspective_warp
+import plate_detection
+import shape_recognition
+import virtual_painter
+from image_pack import IMAGE_EXTS, open_pack
+from tiled_detection import TiledDetector
+
+RESOURCES = 'Resources'
+XMLS = 'Xmls'
+GOLDEN_PATH = os.path.join('golden', 'golden.json')
+
+# Default tolerances
+IOU_MATCH = 0.5        # a box matches its golden box when IoU >= this
+MIN_RECALL = 1.0       # fraction of golden boxes that must be found
+MIN_PRECISION = 1.0    # fraction of found boxes that must be in the golden set
+MAX_THUMB_DIFF = 2.0   # mean abs difference of 16x16 thumbnails, in grey levels
+
+
+# ---------------------------
+# Output helpers
+# ---------------------------
+
+def image_digest(img):
+    """Return an exact hash and a small grayscale thumbnail of an image."""
+    img = np.ascontiguousarray(img)
+    gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    thumb = cv.resize(gray, (16, 16), interpolation=cv.INTER_AREA)
+    return {
+        'shape': list(img.shape),
+        'sha256': hashlib.sha256(img.tobytes()).hexdigest(),
+        'thumb': thumb.astype(int).flatten().tolist(),
+    }
+
+
+def to_boxes(boxes):
+    """Convert an (N, 4) array / list of boxes into a list of int lists."""
+    return [[int(v) for v in b] for b in boxes]
+
+
+def box_iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax2, ay2 = a[0] + a[2], a[1] + a[3]
+    bx2, by2 = b[0] + b[2], b[1] + b[3]
+    iw = max(0, min(ax2, bx2) - max(a[0], b[0]))
+    ih = max(0, min(ay2, by2) - max(a[1], b[1]))
+    inter = iw * ih
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / float(union) if union > 0 else 0.0
+
+
+def box_image(box):
+    """Return the image name a box is tagged with (cascade cases), or None."""
+    return box[0] if box and isinstance(box[0], str) else None
+
+
+def strip_image(box):
+    return box[1:] if box_image(box) is not None else box
+
+
+def match_boxes(golden, found, iou_thresh=IOU_MATCH):
+    """Greedily match found boxes to golden boxes. Returns list of (gi, fi, iou)."""
+    pairs = []
+    for gi, g in enumerate(golden):
+        for fi, f in enumerate(found):
+            iou = box_iou(g, f)
+            if iou >= iou_thresh:
+                pairs.append((iou, gi, fi))
+    pairs.sort(reverse=True)
+    used_g, used_f, matches = set(), set(), []
+    for iou, gi, fi in pairs:
+        if gi not in used_g and fi not in used_f:
+            used_g.add(gi)
+            used_f.add(fi)
+            matches.append((gi, fi, iou))
+    return matches
+
+
+# ---------------------------
+# Cases
+# ---------------------------
+# Every case has a prepare() that loads inputs once (not timed) and a set of
+# variants run(inputs) -> output dict with any of 'boxes', 'labels', 'image'.
+
+# ImagePack set by --pack; unchanged resources are then served as views without decoding
+PACK = None
+
+
+def load_resource(name):
+    path = os.path.join(RESOURCES, name)
+    if PACK is not None:
+        return PACK.load_image(path)
+    return perspective_warp.load_image(path)
+
+
+def load_cascade(name):
+    path = os.path.join(XMLS, name)
+    if not os.path.exists(path):
+        print(f"[WARN] Haar cascade not found: {path}")
+        return None
+    return cv.CascadeClassifier(path)
+
+
+def resource_images():
+    names = sorted(n for n in os.listdir(RESOURCES) if n.lower().endswith(IMAGE_EXTS))
+    return [(n, load_resource(n)) for n in names]
+
+
+def prepare_shapes():
+    return {'img': load_resource('shapes.jpg')}
+
+
+def run_shapes(inputs):
+    shapes = shape_recognition.detect_shapes(inputs['img'])
+    return {
+        'boxes': to_boxes(box for _, box, _ in shapes),
+        'labels': [label for label, _, _ in shapes],
+        'image': shape_recognition.get_contours(inputs['img']),
+    }
+
+
+def prepare_cascade(xml):
+    def prepare():
+        grays = [(n, cv.cvtColor(img, cv.COLOR_BGR2GRAY)) for n, img in resource_images() if img is not None]
+        path = os.path.join(XMLS, xml)
+        # force a 2x1 grid so the bundled (low resolution) images still get split up;
+        # max_object must cover the largest golden box (the face in shapes.jpg is 184 px).
+        # Finer grids on these small images are mostly overlap and add borderline detections.
+        tiled = TiledDetector(path, max_object=256, grid=(2, 1)) if os.path.exists(path) else None
+        return {'cascade': load_cascade(xml), 'tiled': tiled, 'grays': grays}
+    return prepare
+
+
+def run_faces(inputs):
+    boxes = []
+    for name, gray in inputs['grays']:
+        boxes += [[name] + b for b in to_boxes(face_detection.detect_faces(gray, inputs['cascade']))]
+    return {'boxes': boxes}
+
+
+def run_plates(inputs):
+    boxes = []
+    for name, gray in inputs['grays']:
+        boxes += [[name] + b for b in to_boxes(plate_detection.detect_plates(gray, inputs['cascade']))]
+    return {'boxes': boxes}
+
+
+def run_faces_tiled(inputs):
+    return run_faces(dict(inputs, cascade=inputs['tiled']))
+
+
+def run_plates_tiled(inputs):
+    return run_plates(dict(inputs, cascade=inputs['tiled']))
+
+
+def prepare_color():
+    return {'img': load_resource('shapes.jpg')}
+
+
+def run_color(inputs):
+    img = inputs['img']
+    img_result = img.copy()
+    points = virtual_painter.color_detect(img, virtual_painter.myclr, virtual_painter.myclrvals, img_result)
+    # points are (x, y, color index); store them as 8x8 boxes labelled by color
+    return {
+        'boxes': [[int(x) - 4, int(y) - 4, 8, 8] for x, y, _ in points],
+        'labels': [int(idx) for _, _, idx in points],
+        'image': img_result,
+    }
+
+
+def run_color_tracked(inputs):
+    # first update() seeds the windows with a full-frame search, the second runs windowed
+    img = inputs['img']
+    tracker = virtual_painter.MarkerTracker(virtual_painter.myclr)
+    tracker.update(img)
+    img_result = img.copy()
+    points = virtual_painter.track_detect(img, tracker, virtual_painter.myclrvals, img_result)
+    return {
+        'boxes': [[int(x) - 4, int(y) - 4, 8, 8] for x, y, _ in points],
+        'labels': [int(idx) for _, _, idx in points],
+        'image': img_result,
+    }
+
+
+def prepare_warp():
+    img = load_resource('perspective.jpg')
+    h, w = img.shape[:2]
+    # fixed source points inset 10% from the image corners, in pts2 order
+    pts = [(0.1 * w, 0.1 * h), (0.9 * w, 0.1 * h), (0.1 * w, 0.9 * h), (0.9 * w, 0.9 * h)]
+    return {'img': img, 'pts': pts}
+
+
+def run_warp(inputs):
+    return {'image': perspective_warp.warp_perspective(inputs['img'], inputs['pts'], dst_size=(500, 500))}
+
+
+def prepare_auto_warp():
+    return {'img': load_resource('paper.jpg')}
+
+
+def run_auto_warp(inputs):
+    corners = perspective_warp.find_document_corners(inputs['img'])
+    if corners is None:
+        return {'boxes': []}
+    warped = perspective_warp.warp_perspective(inputs['img'], corners, dst_size=(500, 500))
+    # each corner as an 8x8 box around it: IoU >= 0.5 tolerates ~2 px of corner drift
+    return {'boxes': [[int(round(x)) - 4, int(round(y)) - 4, 8, 8] for x, y in corners], 'image': warped}
+
+
+def prepare_grid():
+    imgs = [img for _, img in resource_images() if img is not None][:4]
+    return {'images': imgs}
+
+
+def run_grid(inputs):
+    return {'image': grid_display_demo.create_grid(inputs['images'], 2, 2)}
+
+
+CASES = {
+    'shapes': prepare_shapes,
+    'faces': prepare_cascade('haarcascade_frontalface_default.xml'),
+    'plates': prepare_cascade('haarcascade_russian_plate_number.xml'),
+    'color': prepare_color,
+    'warp': prepare_warp,
+    'auto_warp': prepare_auto_warp,
+    'grid': prepare_grid,
+}
+
+VARIANTS = {
+    'shapes': {'baseline': run_shapes},
+    'faces': {'baseline': run_faces, 'tiled': run_faces_tiled},
+    'plates': {'baseline': run_plates, 'tiled': run_plates_tiled},
+    'color': {'baseline': run_color, 'tracked': run_color_tracked},
+    'warp': {'baseline': run_warp},
+    'auto_warp': {'baseline': run_auto_warp},
+    'grid': {'baseline': run_grid},
+}
+
+
+def register_variant(case, name, fn):
+    """Register an alternative implementation (fast path) for a case."""
+    if case not in VARIANTS:
+        raise ValueError(f"unknown case: {case}")
+    VARIANTS[case][name] = fn
+
+
+# ---------------------------
+# Record / compare
+# ---------------------------
+
+def serialize(output):
+    """Turn a run() output into JSON-friendly golden data."""
+    golden = {}
+    if 'boxes' in output:
+        golden['boxes'] = output['boxes']
+    if 'labels' in output:
+        golden['labels'] = output['labels']
+    if 'image' in output:
+        golden['image'] = image_digest(output['image'])
+    return golden
+
+
+def compare(golden, output, iou_thresh=IOU_MATCH, max_thumb_diff=MAX_THUMB_DIFF):
+    """
+    Compare a run() output against golden data.
+
+    Returns:
+        dict: metrics (recall, precision, mean_iou, label_acc, thumb_diff, exact)
+        and 'ok' if all of them are within tolerance
+    """
+    found = serialize(output)
+    metrics = {'ok': True}
+
+    if 'boxes' in golden:
+        g_boxes, f_boxes = golden['boxes'], found.get('boxes', [])
+        # boxes may carry a leading image name; only compare boxes from the same image
+        matches = []
+        for name in {box_image(b) for b in g_boxes} | {box_image(b) for b in f_boxes}:
+            gi = [i for i, b in enumerate(g_boxes) if box_image(b) == name]
+            fi = [i for i, b in enumerate(f_boxes) if box_image(b) == name]
+            sub = match_boxes([strip_image(g_boxes[i]) for i in gi],
+                              [strip_image(f_boxes[i]) for i in fi], iou_thresh)
+            matches += [(gi[a], fi[b], iou) for a, b, iou in sub]
+        recall = len(matches) / len(g_boxes) if g_boxes else 1.0
+        precision = len(matches) / len(f_boxes) if f_boxes else 1.0
+        metrics['recall'] = recall
+        metrics['precision'] = precision
+        metrics['mean_iou'] = float(np.mean([m[2] for m in matches])) if matches else (1.0 if not g_boxes else 0.0)
+        metrics['ok'] &= recall >= MIN_RECALL and precision >= MIN_PRECISION
+
+        if 'labels' in golden:
+            f_labels = found.get('labels', [])
+            # a variant that returns fewer labels than boxes gets the missing ones wrong
+            correct = sum(1 for gi, fi, _ in matches if fi < len(f_labels) and golden['labels'][gi] == f_labels[fi])
+            metrics['label_acc'] = correct / len(golden['labels']) if golden['labels'] else 1.0
+            metrics['ok'] &= metrics['label_acc'] >= 1.0
+
+    if 'image' in golden:
+        img = found.get('image')
+        if img is None or img['shape'] != golden['image']['shape']:
+            metrics['thumb_diff'] = float('inf')
+            metrics['exact'] = False
+        else:
+            diff = np.abs(np.array(img['thumb']) - np.array(golden['image']['thumb']))
+            metrics['thumb_diff'] = float(diff.mean())
+            metrics['exact'] = img['sha256'] == golden['image']['sha256']
+        metrics['ok'] &= metrics['thumb_diff'] <= max_thumb_diff
+
+    return metrics
+
+
+def time_run(fn, inputs, repeat):
+    """Run fn(inputs) `repeat` times. Returns (last output, median ms)."""
+    times = []
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = fn(inputs)
+        times.append((time.perf_counter() - start) * 1000.0)
+    return output, float(np.median(times))
+
+
+def record(cases, path=GOLDEN_PATH):
+    """Run the baseline of every case and write the golden file."""
+    golden = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            golden = json.load(f)
+    for case in cases:
+        inputs = CASES[case]()
+        golden[case] = serialize(VARIANTS[case]['baseline'](inputs))
+        print(f"[record] {case}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(golden, f, indent=1)
+    print(f"Golden outputs written to {path}")
+
+
+def check(cases, path=GOLDEN_PATH, repeat=5, variants=None):
+    """
+    Compare every variant of every case against the golden file.
+
+    Returns:
+        list of result dicts (case, variant, ms, speedup, metrics)
+    """
+    if not os.path.exists(path):
+        raise SystemExit(f"No golden file at {path}; run with --record first")
+    with open(path) as f:
+        golden = json.load(f)
+
+    results = []
+    for case in cases:
+        if case not in golden:
+            print(f"[WARN] no golden output for '{case}', run with --record first")
+            continue
+        inputs = CASES[case]()
+        base_ms = None
+        for name, fn in VARIANTS[case].items():
+            if variants and name != 'baseline' and name not in variants:
+                continue
+            output, ms = time_run(fn, inputs, repeat)
+            if name == 'baseline':
+                base_ms = ms
+            results.append({
+                'case': case,
+                'variant': name,
+                'ms': ms,
+                'speedup': base_ms / ms if base_ms and ms > 0 else None,
+                'metrics': compare(golden[case], output),
+            })
+    return results
+
+
+def print_report(results):
+    print(f"{'case':<10} {'variant':<16} {'ms':>9} {'speedup':>8}  {'status':<6} metrics")
+    for r in results:
+        m = dict(r['metrics'])
+        ok = m.pop('ok')
+        speedup = f"{r['speedup']:.2f}x" if r['speedup'] else '-'
+        detail = ' '.join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in m.items())
+        print(f"{r['case']:<10} {r['variant']:<16} {r['ms']:>9.2f} {speedup:>8}  {'PASS' if ok else 'FAIL':<6} {detail}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Golden-output regression harness')
+    parser.add_argument('--record', action='store_true', help='(re)record golden outputs from the baseline')
+    parser.add_argument('--case', action='append', choices=sorted(CASES), help='limit to these cases')
+    parser.add_argument('--variant', action='append', help='limit to these variants (baseline always runs)')
+    parser.add_argument('--repeat', type=int, default=5, help='timing repeats per variant')
+    parser.add_argument('--golden', default=GOLDEN_PATH, help='golden file path')
+    parser.add_argument('--pack', default=None, help='read Resources/ from a pack written by image_pack.py')
+    args = parser.parse_args()
+
+    global PACK
+    if args.pack:
+        PACK = open_pack(args.pack)
+
+    cases = args.case or list(CASES)
+    if args.record:
+        record(cases, args.golden)
+        return
+
+    results = check(cases, args.golden, args.repeat, args.variant)
+    print_report(results)
+    if not all(r['metrics']['ok'] for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
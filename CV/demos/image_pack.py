@@ -0,0 +1,205 @@
+"""
+image_pack.py
+
+Tool: pre-decoded, memory-mapped image pack for repeated batch runs.
+
+Features:
+- Decode every image in a directory (e.g. Resources/) once, as BGR like the
+  demos' load_image()
+- Store the raw pixel arrays back to back in a single .pack file, with a JSON
+  index (name, shape, dtype, offset, source file size and mtime) next to it
+- Load images as zero-copy NumPy views into the memory-mapped pack
+- Worker processes opening the same pack share the OS page cache instead of
+  each holding a decoded copy
+
+Run (from the CV/ folder):
+    python demos/image_pack.py Resources Resources.pack
+
+Usage:
+    from image_pack import open_pack
+
+    pack = open_pack('Resources.pack')
+    img = pack['shapes.jpg']          # read-only view, no decoding, no copy
+    img_draw = img.copy()             # copy before drawing on it
+
+Notes:
+    - Packs always hold 3-channel BGR images, so consumers can keep calling
+      cv.cvtColor(img, cv.COLOR_BGR2GRAY). Opening a pack that holds anything
+      else raises ValueError.
+    - load_image() only serves a path from the pack if it lies in the pack's
+      source directory and the file's size and mtime still match the index;
+      anything else (another directory, an edited image) is decoded from disk.
+
+Requirements:
+    - OpenCV (cv2)
+    - numpy
+"""
+
+import argparse
+import json
+import os
+import time
+
+import cv2 as cv
+import numpy as np
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff')
+ALIGN = 64  # byte alignment of every image in the pack
+
+
+def index_path(pack_path):
+    return pack_path + '.json'
+
+
+def pack_images(src_dir, pack_path):
+    """
+    Decode every image in `src_dir` and write them into one pack file.
+
+    Args:
+        src_dir (str): directory with the source images
+        pack_path (str): output .pack file; the index goes to `pack_path + '.json'`
+
+    Returns:
+        dict: the written index
+    """
+    names = sorted(n for n in os.listdir(src_dir) if n.lower().endswith(IMAGE_EXTS))
+    entries = []
+    offset = 0
+    with open(pack_path, 'wb') as f:
+        for name in names:
+            src_path = os.path.join(src_dir, name)
+            st = os.stat(src_path)
+            img = cv.imread(src_path, cv.IMREAD_COLOR)
+            if img is None:
+                print(f"[WARN] Could not read image: {name}")
+                continue
+            pad = -offset % ALIGN
+            f.write(b'\0' * pad)
+            offset += pad
+            data = np.ascontiguousarray(img)
+            f.write(data.tobytes())
+            entries.append({
+                'name': name,
+                'shape': list(data.shape),
+                'dtype': data.dtype.str,
+                'offset': offset,
+                'size': st.st_size,
+                'mtime_ns': st.st_mtime_ns,
+            })
+            offset += data.nbytes
+
+    index = {'version': 2, 'source': os.path.abspath(src_dir), 'images': entries}
+    with open(index_path(pack_path), 'w') as f:
+        json.dump(index, f, indent=1)
+    return index
+
+
+class ImagePack:
+    """
+    Read access to a pack written by pack_images().
+
+    The whole pack is memory-mapped once; every image is a view into it.
+    Pickling only sends the path, so a pack can be handed to worker processes,
+    which re-map the same file.
+
+    Args:
+        pack_path (str): path of the .pack file
+        mode (str): np.memmap mode; 'r' gives read-only views, 'c' gives
+            writable copy-on-write views
+    """
+
+    def __init__(self, pack_path, mode='r'):
+        self.pack_path = pack_path
+        self.mode = mode
+        with open(index_path(pack_path)) as f:
+            self.index = json.load(f)
+        self._entries = {e['name']: e for e in self.index['images']}
+        self._stale = set()  # names already warned about in load_image()
+        for e in self.index['images']:
+            if len(e['shape']) != 3 or e['shape'][2] != 3:
+                raise ValueError(f"{pack_path}: '{e['name']}' is not a BGR image (shape {e['shape']}); "
+                                 f"re-create the pack with image_pack.py")
+        size = os.path.getsize(pack_path)
+        self._data = np.memmap(pack_path, dtype=np.uint8, mode=mode, shape=(size,)) if size else np.zeros(0, np.uint8)
+
+    def __getstate__(self):
+        return {'pack_path': self.pack_path, 'mode': self.mode}
+
+    def __setstate__(self, state):
+        self.__init__(state['pack_path'], state['mode'])
+
+    def names(self):
+        return list(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def source(self):
+        """Absolute path of the directory the pack was built from."""
+        return self.index['source']
+
+    def is_current(self, path):
+        """True if `path` is a file of the pack's source directory that is unchanged since packing."""
+        name = os.path.basename(path)
+        e = self._entries.get(name)
+        if e is None or os.path.dirname(os.path.abspath(path)) != self.source:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return e.get('size') == st.st_size and e.get('mtime_ns') == st.st_mtime_ns
+
+    def __getitem__(self, name):
+        """Return the image called `name` as a zero-copy view into the pack."""
+        e = self._entries[name]
+        dtype = np.dtype(e['dtype'])
+        nbytes = int(np.prod(e['shape'])) * dtype.itemsize
+        return self._data[e['offset']:e['offset'] + nbytes].view(dtype).reshape(e['shape'])
+
+    def load_image(self, path):
+        """Drop-in for the demos' load_image(): serve from the pack, fall back to cv.imread."""
+        name = os.path.basename(path)
+        if self.is_current(path):
+            return self[name]
+        if name in self._entries and name not in self._stale and os.path.dirname(os.path.abspath(path)) == self.source:
+            self._stale.add(name)
+            print(f"[WARN] {path} does not match its entry in {self.pack_path} (changed since packing?); decoding it")
+        img = cv.imread(path)
+        if img is None:
+            print(f"[WARN] Could not read image: {path}")
+        return img
+
+
+_OPEN_PACKS = {}
+
+
+def open_pack(pack_path, mode='r'):
+    """Return an ImagePack, mapping each pack file at most once per process."""
+    key = (os.path.abspath(pack_path), mode)
+    pack = _OPEN_PACKS.get(key)
+    if pack is None:
+        pack = ImagePack(pack_path, mode)
+        _OPEN_PACKS[key] = pack
+    return pack
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode a directory of images into a memory-mapped pack')
+    parser.add_argument('src_dir', help='directory with the images (e.g. Resources)')
+    parser.add_argument('pack_path', help='output pack file (e.g. Resources.pack)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = pack_images(args.src_dir, args.pack_path)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(args.pack_path)
+    print(f"Packed {len(index['images'])} images ({size / 1e6:.1f} MB) into {args.pack_path} in {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
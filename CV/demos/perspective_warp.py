@@ -9,12 +9,21 @@ Features:
     1) Interactive: click 4 points on the image in the order you want
     2) Fallback: use a predefined set of source points
 - Compute perspective transform and show warped image
+- The preview is only redrawn when the selected points change, into a reused buffer
+- Automatic mode: find the document's corners (coarse on a downscaled copy,
+  refined at full resolution) and warp without any clicks
+- Batch mode: rectify every image in a directory with a worker pool, optionally
+  reading pre-decoded images from a shared memory-mapped pack (see image_pack.py)
 
 Run:
     python perspective_warp.py
+    python perspective_warp.py --batch Resources outputs/rectified [--workers 4] [--pack Resources.pack]
 
 Notes:
     - Click exactly 4 points in interactive mode and then press 'w' to perform warp.
+    - Press 'a' to detect the 4 corners automatically. In perspective.jpg the
+      notebook covers only a few percent of the image, so the demo accepts quads
+      down to DEMO_MIN_AREA_RATIO; it finds the notebook's right-hand page.
     - Press 'r' to reset selected points, 'q' to quit.
 
 Requirements:
@@ -22,9 +31,15 @@ Requirements:
     - numpy
 """
 
+import argparse
 import cv2 as cv
 import numpy as np
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from frame_buffers import BufferPool
+from image_pack import IMAGE_EXTS, open_pack
 
 # ---------------------------
 # Utility: safe image loader
@@ -45,14 +60,16 @@ def load_image(path):
 # Interactive point selector
 # ---------------------------
 POINTS = []
+DIRTY = True  # set whenever POINTS changes so the preview gets redrawn
 
 
 def mouse_callback(event, x, y, flags, param):
     """Mouse callback that collects up to 4 points on left-button clicks."""
-    global POINTS
+    global POINTS, DIRTY
     if event == cv.EVENT_LBUTTONDOWN:
         if len(POINTS) < 4:
             POINTS.append((x, y))
+            DIRTY = True
             print(f"Point added: {(x, y)}")
         else:
             print("Already have 4 points. Press 'r' to reset.")
@@ -62,7 +79,7 @@ def mouse_callback(event, x, y, flags, param):
 # Perspective warp function
 # ---------------------------
 
-def warp_perspective(src_img, src_pts, dst_size=(500, 500)):
+def warp_perspective(src_img, src_pts, dst_size=(500, 500), dst=None):
     """
     Compute and apply a perspective transform.
 
@@ -70,6 +87,7 @@ def warp_perspective(src_img, src_pts, dst_size=(500, 500)):
         src_img (np.ndarray): source image
         src_pts (list of tuple): 4 source points (x,y) in source image
         dst_size (tuple): (width, height) of the output warped image
+        dst (np.ndarray, optional): preallocated (height, width[, channels]) output
 
     Returns:
         np.ndarray: warped image
@@ -81,53 +99,360 @@ def warp_perspective(src_img, src_pts, dst_size=(500, 500)):
     # Order points as float32 array
     pts1 = np.float32(src_pts)
     # Destination points: full rectangle
-    pts2 = np.float32([[0, 0], [width, 0], [0, height], [width, height]])
+    pts2 = _dst_corners(width, height)
 
     matrix = cv.getPerspectiveTransform(pts1, pts2)
-    warped = cv.warpPerspective(src_img, matrix, (width, height))
+    warped = cv.warpPerspective(src_img, matrix, (width, height), dst=dst)
     return warped
 
 
+def _dst_corners(width, height):
+    """Destination corners used by warp_perspective(): TL, TR, BL, BR."""
+    return np.float32([[0, 0], [width, 0], [0, height], [width, height]])
+
+
+def perspective_transforms(src_pts, dst_pts):
+    """
+    Solve N perspective transforms at once (vectorised getPerspectiveTransform).
+
+    Args:
+        src_pts (np.ndarray): (N, 4, 2) source points
+        dst_pts (np.ndarray): (4, 2) destination points shared by all transforms
+
+    Returns:
+        np.ndarray: (N, 3, 3) float64 matrices mapping src_pts[i] onto dst_pts
+    """
+    src = np.asarray(src_pts, np.float64).reshape(-1, 4, 2)
+    dst = np.asarray(dst_pts, np.float64).reshape(4, 2)
+    n = len(src)
+    x, y = src[:, :, 0], src[:, :, 1]
+    u, v = np.broadcast_to(dst[:, 0], (n, 4)), np.broadcast_to(dst[:, 1], (n, 4))
+    zeros, ones = np.zeros((n, 4)), np.ones((n, 4))
+    # u = (a x + b y + c) / (g x + h y + 1), v = (d x + e y + f) / (g x + h y + 1)
+    rows_u = np.stack([x, y, ones, zeros, zeros, zeros, -x * u, -y * u], axis=-1)
+    rows_v = np.stack([zeros, zeros, zeros, x, y, ones, -x * v, -y * v], axis=-1)
+    a = np.concatenate([rows_u, rows_v], axis=1)
+    b = np.concatenate([u, v], axis=1)
+    coeffs = np.linalg.solve(a, b[..., None])[..., 0]
+    return np.concatenate([coeffs, np.ones((n, 1))], axis=1).reshape(n, 3, 3)
+
+
+def _perspective_maps(inv, width, height, pool=None):
+    """
+    Build stacked cv.remap maps for N inverse homographies.
+
+    Every term that depends only on the column or only on the row is computed on
+    a small (N, width) / (N, height) array; the full-size maps then take one
+    broadcast add each, plus a shared reciprocal of the denominator. With a
+    BufferPool the three full-size buffers are reused across calls.
+
+    Returns:
+        tuple: float32 (map_x, map_y), each of shape (N * height, width)
+    """
+    n = len(inv)
+    inv = inv.astype(np.float32)
+    u = np.arange(width, dtype=np.float32)
+    v = np.arange(height, dtype=np.float32)
+
+    def plane(r, out):
+        # inv[r] . (u, v, 1) for every output pixel; copy + in-place add avoids
+        # the 64 KB scratch buffer numpy uses for a two-input broadcast
+        np.copyto(out, (inv[:, r, 0, None] * u + inv[:, r, 2, None])[:, None, :])
+        np.add(out, (inv[:, r, 1, None] * v)[:, :, None], out=out)
+        return out
+
+    if pool is None:
+        map_x, map_y, den = (np.empty((n, height, width), np.float32) for _ in range(3))
+    else:
+        map_x, map_y, den = (pool.get_rows(name, n, (height, width), np.float32)
+                             for name in ('warp_map_x', 'warp_map_y', 'warp_map_den'))
+    np.reciprocal(plane(2, den), out=den)
+    np.multiply(plane(0, map_x), den, out=map_x)
+    np.multiply(plane(1, map_y), den, out=map_y)
+    return map_x.reshape(n * height, width), map_y.reshape(n * height, width)
+
+
+def warp_perspective_batch(src_img, src_pts, dst_size=(500, 500), dst=None, pool=None):
+    """
+    Warp N quadrilaterals of one image into a stack of equally sized outputs.
+
+    Equivalent to calling warp_perspective() once per quad, but all inverse
+    homographies are solved with NumPy and the whole stack is filled by a
+    single cv.remap call over stacked (N * height, width) maps. cv.remap is
+    limited to 32767 map rows, so very large batches are split into as few
+    calls as that allows.
+
+    Args:
+        src_img (np.ndarray): source image
+        src_pts (array-like): (N, 4, 2) source points, each in warp_perspective() order
+        dst_size (tuple): (width, height) of every warped output
+        dst (np.ndarray, optional): preallocated C-contiguous (N, height, width[, channels]) output
+        pool (BufferPool, optional): reuse the remap map buffers across calls
+
+    Returns:
+        np.ndarray: (N, height, width[, channels]) stack of warped images
+
+    Raises:
+        ValueError: if `dst` has the wrong shape/dtype or is not C-contiguous (the
+            stacked output must be a view of it, not a copy)
+    """
+    width, height = dst_size
+    src_pts = np.asarray(src_pts, np.float32).reshape(-1, 4, 2)
+    n = len(src_pts)
+    shape = (n, height, width) + src_img.shape[2:]
+    if dst is None:
+        dst = np.empty(shape, src_img.dtype)
+    elif dst.shape != shape or dst.dtype != src_img.dtype:
+        raise ValueError(f"dst must be a {shape} {src_img.dtype} array, got {dst.shape} {dst.dtype}")
+    elif not dst.flags.c_contiguous:
+        raise ValueError("dst must be C-contiguous")
+    if n == 0:
+        return dst
+
+    # output pixel -> source pixel: invert the src -> dst transforms, as warpPerspective does
+    inv = np.linalg.inv(perspective_transforms(src_pts, _dst_corners(width, height)))
+    step = max(1, (np.iinfo(np.int16).max - 1) // height)
+    for i in range(0, n, step):
+        part = inv[i:i + step]
+        map_x, map_y = _perspective_maps(part, width, height, pool)
+        out = dst[i:i + len(part)].reshape((len(part) * height, width) + src_img.shape[2:])
+        cv.remap(src_img, map_x, map_y, cv.INTER_LINEAR, dst=out, borderMode=cv.BORDER_CONSTANT)
+    return dst
+
+
+# ---------------------------
+# Automatic corner detection
+# ---------------------------
+
+def order_points(pts, min_dist=1.0):
+    """
+    Order 4 points to match the destination layout used by warp_perspective():
+    top-left, top-right, bottom-left, bottom-right.
+
+    The points are sorted by their angle around the centroid (clockwise on
+    screen) and the cycle starts at the one with the smallest x + y, so quads
+    rotated by ~45 degrees still get 4 different corners.
+
+    Returns:
+        np.ndarray or None: 4x2 float32 ordered corners, or None if two of the
+        points are closer than `min_dist` (a degenerate quad)
+    """
+    pts = np.float32(pts).reshape(4, 2)
+    dist = np.linalg.norm(pts[:, None] - pts[None], axis=-1)
+    if dist[np.triu_indices(4, 1)].min() < min_dist:
+        return None
+    center = pts.mean(axis=0)
+    cycle = pts[np.argsort(np.arctan2(pts[:, 1] - center[1], pts[:, 0] - center[0]))]
+    cycle = np.roll(cycle, -int(np.argmin(cycle.sum(axis=1))), axis=0)  # TL, TR, BR, BL
+    return cycle[[0, 1, 3, 2]]
+
+
+def _find_quad(edges, min_area, max_area):
+    """Return the largest convex 4-point contour in an edge map as 4x2 float32, or None."""
+    contours, _ = cv.findContours(edges, cv.RETR_LIST, cv.CHAIN_APPROX_SIMPLE)
+    for cnt in sorted(contours, key=cv.contourArea, reverse=True):
+        if cv.contourArea(cnt) < min_area:
+            break
+        peri = cv.arcLength(cnt, True)
+        approx = cv.approxPolyDP(cnt, 0.02 * peri, True)
+        # quads covering (nearly) the whole image trace its frame, not a page in it
+        if len(approx) == 4 and cv.isContourConvex(approx) and cv.contourArea(approx) <= max_area:
+            return approx.reshape(4, 2).astype(np.float32)
+    return None
+
+
+def find_document_corners(img, max_dim=500, min_area_ratio=0.1, max_area_ratio=0.9, min_threshold=10):
+    """
+    Find the corners of the largest quadrilateral (e.g. a sheet of paper) in an image.
+
+    The contour search runs on a copy downscaled so its longest side is
+    `max_dim`; the 4 coarse corners are then refined with sub-pixel accuracy
+    on the full resolution grayscale image.
+
+    The Canny thresholds come from the image: the upper one starts at the Otsu
+    threshold of the gradient magnitude and is halved until a quadrilateral is
+    found, so low-contrast pages (white paper on a light desk) are still picked up.
+
+    Args:
+        img (np.ndarray): BGR source image
+        max_dim (int): longest side of the downscaled search image
+        min_area_ratio (float): smallest accepted quad, as a fraction of the image area
+        max_area_ratio (float): largest accepted quad (larger ones trace the image border)
+        min_threshold (float): lowest upper Canny threshold that is tried
+
+    Returns:
+        np.ndarray or None: 4x2 float32 corners ordered like warp_perspective()
+        expects, or None if no (non-degenerate) quadrilateral was found
+    """
+    h, w = img.shape[:2]
+    scale = min(1.0, max_dim / float(max(h, w)))
+    small = cv.resize(img, (int(w * scale), int(h * scale)), interpolation=cv.INTER_AREA) if scale < 1.0 else img
+
+    # coarse: largest convex 4-point contour on the small image
+    gray_small = cv.cvtColor(small, cv.COLOR_BGR2GRAY)
+    blur = cv.GaussianBlur(gray_small, (5, 5), 1)
+    # same L1 Sobel magnitude Canny thresholds against
+    grad = cv.Sobel(blur, cv.CV_16S, 1, 0, ksize=3)
+    grad = cv.add(cv.convertScaleAbs(grad), cv.convertScaleAbs(cv.Sobel(blur, cv.CV_16S, 0, 1, ksize=3)))
+    high, _ = cv.threshold(grad, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
+
+    min_area = min_area_ratio * small.shape[0] * small.shape[1]
+    max_area = max_area_ratio * small.shape[0] * small.shape[1]
+    kernel = np.ones((5, 5), np.uint8)
+    coarse = None
+    high = max(high, min_threshold)
+    while coarse is None and high >= min_threshold:
+        edges = cv.Canny(blur, high / 2, high)
+        # close small gaps so a faint page border becomes one contour
+        edges = cv.morphologyEx(edges, cv.MORPH_CLOSE, kernel)
+        coarse = _find_quad(edges, min_area, max_area)
+        high /= 2
+    if coarse is None:
+        return None
+
+    # fine: map back to full resolution and refine each corner locally
+    corners = (coarse / scale).reshape(-1, 1, 2)
+    gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
+    win = int(np.clip(round(2.0 / scale), 3, 15))
+    criteria = (cv.TERM_CRITERIA_EPS + cv.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+    corners = cv.cornerSubPix(gray, np.ascontiguousarray(corners, dtype=np.float32), (win, win), (-1, -1), criteria)
+    corners[..., 0] = np.clip(corners[..., 0], 0, w - 1)
+    corners[..., 1] = np.clip(corners[..., 1], 0, h - 1)
+
+    return order_points(corners)
+
+
+def auto_warp(src_img, dst_size=(500, 500), max_dim=500, dst=None):
+    """
+    Detect the document corners and warp in one step.
+
+    Returns:
+        np.ndarray or None: warped image, or None if no corners were found
+    """
+    corners = find_document_corners(src_img, max_dim=max_dim)
+    if corners is None:
+        return None
+    return warp_perspective(src_img, corners, dst_size=dst_size, dst=dst)
+
+
+def _rectify_file(job):
+    """Worker: rectify one image file (or pack entry). Returns (name, ok)."""
+    src_path, dst_path, dst_size, pack_path = job
+    if pack_path:
+        # every worker maps the same pack once; images are views, nothing is decoded
+        img = open_pack(pack_path).load_image(src_path)
+    else:
+        img = load_image(src_path)
+    if img is None:
+        return os.path.basename(src_path), False
+    warped = auto_warp(img, dst_size=dst_size)
+    if warped is None:
+        print(f"[WARN] no document found in: {src_path}")
+        return os.path.basename(src_path), False
+    cv.imwrite(dst_path, warped)
+    return os.path.basename(src_path), True
+
+
+def batch_rectify(input_dir, output_dir, dst_size=(500, 500), workers=None, pack_path=None):
+    """
+    Rectify every image in `input_dir` into `output_dir` using a process pool.
+
+    Args:
+        input_dir (str): directory with source images
+        output_dir (str): directory for the warped results (created if missing)
+        dst_size (tuple): (width, height) of each warped page
+        workers (int, optional): number of worker processes (default: CPU count)
+        pack_path (str, optional): pack of `input_dir` written by image_pack.py;
+            unchanged images are then read from it instead of being decoded. The
+            file list always comes from `input_dir`; a pack built from another
+            directory is ignored.
+
+    Returns:
+        dict: pages, rectified, failed (list of names), seconds, pages_per_sec
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if pack_path and open_pack(pack_path).source != os.path.abspath(input_dir):
+        print(f"[WARN] {pack_path} was built from {open_pack(pack_path).source}, not {input_dir}; ignoring it")
+        pack_path = None
+    names = sorted(n for n in os.listdir(input_dir) if n.lower().endswith(IMAGE_EXTS))
+    jobs = [(os.path.join(input_dir, n), os.path.join(output_dir, n), dst_size, pack_path) for n in names]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        results = list(ex.map(_rectify_file, jobs))
+    elapsed = time.perf_counter() - start
+
+    failed = [name for name, ok in results if not ok]
+    return {
+        'pages': len(jobs),
+        'rectified': len(jobs) - len(failed),
+        'failed': failed,
+        'seconds': elapsed,
+        'pages_per_sec': len(jobs) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
 # ---------------------------
 # Main demo
 # ---------------------------
 
+# smallest quad the 'a' key accepts, as a fraction of the image (the notebook
+# page in perspective.jpg covers ~3%; find_document_corners defaults to 10%)
+DEMO_MIN_AREA_RATIO = 0.02
+
+
 def run_demo():
     """Run the interactive perspective warp demo."""
-    global POINTS
+    global POINTS, DIRTY
 
     img = load_image(os.path.join('Resources', 'perspective.jpg'))
     if img is None:
         print("perspective.jpg not found in Resources/. Exiting.")
         return
 
-    clone = img.copy()
+    pool = BufferPool()
     window_name = 'Perspective Warp - click 4 points'
     cv.namedWindow(window_name)
     cv.setMouseCallback(window_name, mouse_callback)
 
     print("Interactive mode: click 4 points (corners) on the source image.")
-    print("Press 'w' to warp, 'r' to reset points, 'q' to quit.")
+    print("Press 'w' to warp, 'a' to detect corners automatically, 'r' to reset points, 'q' to quit.")
 
     while True:
-        disp = clone.copy()
-        # draw selected points
-        for i, p in enumerate(POINTS):
-            cv.circle(disp, p, 5, (0, 255, 0), -1)
-            cv.putText(disp, str(i + 1), (p[0] + 5, p[1] - 5), cv.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        pool.begin_frame()
+        if DIRTY:
+            # redraw only when the points changed, reusing the same display buffer
+            disp = pool.copy_into('disp', img)
+            # draw selected points
+            for i, p in enumerate(POINTS):
+                cv.circle(disp, p, 5, (0, 255, 0), -1)
+                cv.putText(disp, str(i + 1), (p[0] + 5, p[1] - 5), cv.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+            cv.imshow(window_name, disp)
+            DIRTY = False
+        pool.end_frame()
 
-        cv.imshow(window_name, disp)
         key = cv.waitKey(1) & 0xFF
 
         if key == ord('q'):
             break
         elif key == ord('r'):
             POINTS = []
+            DIRTY = True
             print("Points reset")
+        elif key == ord('a'):
+            corners = find_document_corners(img, min_area_ratio=DEMO_MIN_AREA_RATIO)
+            if corners is None:
+                print('No document corners found')
+            else:
+                POINTS = [(int(round(x)), int(round(y))) for x, y in corners]
+                DIRTY = True
+                print('Detected corners:', POINTS)
         elif key == ord('w'):
             if len(POINTS) == 4:
                 try:
-                    warped = warp_perspective(img, POINTS, dst_size=(500, 500))
+                    warped = warp_perspective(img, POINTS, dst_size=(500, 500),
+                                              dst=pool.get('warped', (500, 500) + img.shape[2:]))
                     cv.imshow('Warped Result', warped)
                     cv.imwrite('outputs/warped_result.jpg', warped) if os.path.isdir('outputs') else None
                     print('Warp applied. Press any key on warped window or continue interacting.')
@@ -136,8 +461,30 @@ def run_demo():
             else:
                 print('Need 4 points to perform warp. Currently:', len(POINTS))
 
+    print(pool.format_stats())
     cv.destroyAllWindows()
 
 
+def main():
+    parser = argparse.ArgumentParser(description='Perspective warp demo')
+    parser.add_argument('--batch', nargs=2, metavar=('INPUT_DIR', 'OUTPUT_DIR'),
+                        help='automatically rectify every image in INPUT_DIR')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes for --batch')
+    parser.add_argument('--size', type=int, nargs=2, default=(500, 500), metavar=('W', 'H'),
+                        help='output page size')
+    parser.add_argument('--pack', default=None, help='pre-decoded image pack of INPUT_DIR for --batch')
+    args = parser.parse_args()
+
+    if args.batch:
+        stats = batch_rectify(args.batch[0], args.batch[1], dst_size=tuple(args.size), workers=args.workers,
+                              pack_path=args.pack)
+        print(f"Rectified {stats['rectified']}/{stats['pages']} pages in {stats['seconds']:.2f}s "
+              f"({stats['pages_per_sec']:.1f} pages/sec)")
+        if stats['failed']:
+            print('Failed:', ', '.join(stats['failed']))
+    else:
+        run_demo()
+
+
 if __name__ == '__main__':
-    run_demo()
+    main()
@@ -8,9 +8,15 @@ Features:
 - Convert frames to grayscale
 - Detect number plates using pre-trained Haar Cascade
 - Draw rectangles and label around detected plates
+- Optionally log every detection to a columnar detection log (--log DIR)
+- Tiled mode for high-resolution cameras: overlapping tiles detected in parallel (--tiled)
+- Rectify all plates of a frame into one contiguous, fixed-size stack for OCR (--rectify)
 
 Run:
     python plate_detection.py
+    python plate_detection.py --log logs/session1 [--stream cam0]
+    python plate_detection.py --tiled [--max-object 256]
+    python plate_detection.py --rectify
 
 Requirements:
     - OpenCV (cv2)
@@ -18,9 +24,16 @@ Requirements:
     - Xmls/haarcascade_russian_plate_number.xml
 """
 
+import argparse
 import cv2 as cv
+import numpy as np
 import os
 
+from detection_log import DetectionWriter
+from frame_buffers import BufferPool
+from perspective_warp import order_points, warp_perspective, warp_perspective_batch
+from tiled_detection import TiledDetector
+
 
 def get_webcam():
     """Initialize webcam capture."""
@@ -31,15 +44,96 @@ def get_webcam():
     return cam
 
 
-def run_demo():
+def detect_plates(gray, plate_cas, scale_factor=1.1, min_neighbors=4, min_area=500):
+    """Return plate boxes (x, y, w, h) found in a grayscale image, ignoring small detections."""
+    plates = plate_cas.detectMultiScale(gray, scale_factor, min_neighbors)
+    return [(x, y, w, h) for (x, y, w, h) in plates if w * h > min_area]
+
+
+# Output size of a rectified plate (width, height); 520x112 mm plates are ~4.6:1
+PLATE_SIZE = (208, 48)
+
+
+def estimate_plate_corners(gray, box, pad=0.1):
+    """
+    Estimate the 4 corners of the plate inside a detection box.
+
+    The (slightly padded) box is Otsu-thresholded and the largest blob's
+    minimum-area rectangle is used, so rotated plates get deskewed. Falls back
+    to the box corners when no plausible blob is found.
+
+    Returns:
+        np.ndarray: 4x2 float32 corners in frame coordinates, ordered for warp_perspective()
+    """
+    x, y, w, h = box
+    px, py = int(w * pad), int(h * pad)
+    x0, y0 = max(0, x - px), max(0, y - py)
+    x1, y1 = min(gray.shape[1], x + w + px), min(gray.shape[0], y + h + py)
+    roi = gray[y0:y1, x0:x1]
+
+    _, bw = cv.threshold(roi, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
+    contours, _ = cv.findContours(bw, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+    if contours:
+        cnt = max(contours, key=cv.contourArea)
+        if cv.contourArea(cnt) > 0.3 * w * h:
+            corners = order_points(cv.boxPoints(cv.minAreaRect(cnt)) + np.float32([x0, y0]))
+            if corners is not None:
+                return corners
+    return order_points([(x, y), (x + w, y), (x, y + h), (x + w, y + h)])
+
+
+def rectify_plates(frame, boxes, plate_size=PLATE_SIZE, gray=None, pool=None):
+    """
+    Crop, deskew and resize every detected plate into one preallocated stack.
+
+    Corners are estimated per plate on its small ROI; the pixel resampling for
+    all plates is then done by warp_perspective_batch() (one cv.remap call)
+    straight into the stack. A single plate goes through warp_perspective().
+
+    Args:
+        frame (np.ndarray): BGR frame
+        boxes (list): plate boxes (x, y, w, h)
+        plate_size (tuple): (width, height) of every rectified plate
+        gray (np.ndarray, optional): grayscale frame, if already computed
+        pool (BufferPool, optional): reuse the stack and remap map buffers across frames
+
+    Returns:
+        np.ndarray: C-contiguous (N, height, width, channels) array
+    """
+    width, height = plate_size
+    row_shape = (height, width) + frame.shape[2:]
+    if pool is None:
+        stack = np.empty((len(boxes),) + row_shape, frame.dtype)
+    else:
+        stack = pool.get_rows('plates', len(boxes), row_shape, frame.dtype)
+    if gray is None and len(boxes):
+        gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+
+    corners = [estimate_plate_corners(gray, box) for box in boxes]
+    if len(corners) == 1:
+        warp_perspective(frame, corners[0], dst_size=plate_size, dst=stack[0])
+    elif corners:
+        warp_perspective_batch(frame, corners, dst_size=plate_size, dst=stack, pool=pool)
+    return stack
+
+
+def run_demo(log_dir=None, stream='cam0', tiled=False, max_object=256, rectify=False):
     # Load Haar cascade for number plate detection
     plate_cascade_path = os.path.join('Xmls', 'haarcascade_russian_plate_number.xml')
     if not os.path.exists(plate_cascade_path):
         print(f"Haar cascade not found: {plate_cascade_path}")
         return
-    plate_cas = cv.CascadeClassifier(plate_cascade_path)
+    if tiled:
+        # same interface as CascadeClassifier, but runs overlapping tiles in a thread pool
+        plate_cas = TiledDetector(plate_cascade_path, max_object=max_object)
+    else:
+        plate_cas = cv.CascadeClassifier(plate_cascade_path)
 
     cam = get_webcam()
+    # detections are handed to a background writer so logging never blocks the loop
+    writer = DetectionWriter(log_dir) if log_dir else None
+    frame_idx = 0
+    pool = BufferPool(track_allocations=False)
 
     print("Press 'q' to quit")
 
@@ -50,13 +144,20 @@ def run_demo():
             break
 
         gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
-        plates = plate_cas.detectMultiScale(gray, 1.1, 4)
+        plates = detect_plates(gray, plate_cas)
+        if writer:
+            writer.log(stream, 'plate', plates, frame_idx)
+        frame_idx += 1
+
+        if rectify and plates:
+            # rectify before drawing so the overlays don't end up in the crops
+            stack = rectify_plates(frame, plates, gray=gray, pool=pool)
+            # the stack is contiguous, so all plates can be shown as one tall image without copying
+            cv.imshow('Rectified Plates', stack.reshape(-1, *stack.shape[2:]))
 
         for (x, y, w, h) in plates:
-            area = w * h
-            if area > 500:  # filter small detections
-                cv.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
-                cv.putText(frame, 'Number Plate', (x, y - 5), cv.FONT_HERSHEY_PLAIN, 1, (255, 0, 0), 2)
+            cv.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+            cv.putText(frame, 'Number Plate', (x, y - 5), cv.FONT_HERSHEY_PLAIN, 1, (255, 0, 0), 2)
 
         cv.imshow('Plate Detection', frame)
 
@@ -65,7 +166,24 @@ def run_demo():
 
     cam.release()
     cv.destroyAllWindows()
+    if tiled:
+        plate_cas.close()
+    if writer:
+        writer.close()
+        print(f"Logged {writer.rows_written} detections to {log_dir} (dropped {writer.dropped})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Plate detection demo')
+    parser.add_argument('--log', metavar='DIR', help='append detections to a detection log directory')
+    parser.add_argument('--stream', default='cam0', help='stream name stored with each detection')
+    parser.add_argument('--tiled', action='store_true', help='detect on overlapping tiles in parallel')
+    parser.add_argument('--max-object', type=int, default=256, help='largest expected plate size in pixels (--tiled)')
+    parser.add_argument('--rectify', action='store_true', help='show the rectified plate stack')
+    args = parser.parse_args()
+    run_demo(log_dir=args.log, stream=args.stream, tiled=args.tiled, max_object=args.max_object,
+             rectify=args.rectify)
 
 
 if __name__ == '__main__':
-    run_demo()
\ No newline at end of file
+    main()
\ No newline at end of file
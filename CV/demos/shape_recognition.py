@@ -30,9 +30,12 @@ def load_image(path):
     return img
 
 
-def get_contours(img):
+def detect_shapes(img):
     """
-    Find contours, approximate shapes and draw them on a copy of the image.
+    Find contours and classify them.
+
+    Returns:
+        list of (shape_type, (x, y, w, h), contour) tuples
     """
     img_gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
     img_blur = cv.GaussianBlur(img_gray, (5, 5), 1)
@@ -40,13 +43,10 @@ def get_contours(img):
 
     contours, _ = cv.findContours(img_canny, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
 
-    img_contour = img.copy()
-
+    shapes = []
     for cnt in contours:
         area = cv.contourArea(cnt)
         if area > 500:  # filter noise
-            cv.drawContours(img_contour, [cnt], -1, (255, 0, 0), 2)
-
             # perimeter and polygon approx
             peri = cv.arcLength(cnt, True)
             approx = cv.approxPolyDP(cnt, 0.02 * peri, True)
@@ -75,10 +75,22 @@ def get_contours(img):
                 else:
                     shape_type = "Oval" 
 
-            
-            cv.rectangle(img_contour, (x, y), (x + w, y + h), (0, 255, 0), 2)
-            cv.putText(img_contour, shape_type, (x, y - 10), cv.FONT_HERSHEY_SIMPLEX,
-                       0.7, (0, 255, 0), 2)
+            shapes.append((shape_type, (x, y, w, h), cnt))
+
+    return shapes
+
+
+def get_contours(img):
+    """
+    Find contours, approximate shapes and draw them on a copy of the image.
+    """
+    img_contour = img.copy()
+
+    for shape_type, (x, y, w, h), cnt in detect_shapes(img):
+        cv.drawContours(img_contour, [cnt], -1, (255, 0, 0), 2)
+        cv.rectangle(img_contour, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        cv.putText(img_contour, shape_type, (x, y - 10), cv.FONT_HERSHEY_SIMPLEX,
+                   0.7, (0, 255, 0), 2)
 
     return img_contour
 
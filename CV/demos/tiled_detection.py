@@ -0,0 +1,186 @@
+"""
+tiled_detection.py
+
+Helper: parallel tiled Haar cascade detection for high-resolution frames.
+
+Features:
+- Split a grayscale frame into about one tile per worker, overlapping by the
+  largest expected object size
+- Run detectMultiScale on every tile in a thread pool (OpenCV releases the GIL)
+- Merge duplicate boxes across tile seams with non-maximum suppression
+
+Usage:
+    from tiled_detection import TiledDetector
+
+    detector = TiledDetector('Xmls/haarcascade_frontalface_default.xml', max_object=256)
+    faces = detector.detect(gray, 1.1, 4)
+    # or pass it where a CascadeClassifier is expected: detect_faces(gray, detector)
+
+Notes:
+    - Tiles overlap by `max_object` pixels, so every object up to that size lies
+      completely inside at least one tile. Larger objects are not searched for.
+    - Keep the overlap a small fraction of the tile: every overlapping pixel is
+      scanned again at the finest (most expensive) pyramid levels.
+    - CascadeClassifier is not safe to share between threads, so every worker
+      thread loads its own copy of the cascade.
+    - detectMultiScale is already parallelised inside OpenCV. While detect() runs,
+      OpenCV's own thread count is set to 1 so the tiles don't compete for cores.
+      The setting is process wide, so it is reference counted under a module
+      lock: with several detectors running at once (e.g. faces and plates) it
+      is saved by the first one to start and restored by the last one to finish.
+
+Requirements:
+    - OpenCV (cv2)
+    - numpy
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import cv2 as cv
+import numpy as np
+
+
+# process-wide OpenCV thread count, shared by all detectors in this process
+_THREADS_LOCK = threading.Lock()
+_threads_users = 0
+_threads_saved = None
+
+
+@contextmanager
+def _opencv_single_threaded():
+    """Set cv.setNumThreads(1) while any caller is inside, restoring it after the last one leaves."""
+    global _threads_users, _threads_saved
+    with _THREADS_LOCK:
+        if _threads_users == 0:
+            _threads_saved = cv.getNumThreads()
+            cv.setNumThreads(1)
+        _threads_users += 1
+    try:
+        yield
+    finally:
+        with _THREADS_LOCK:
+            _threads_users -= 1
+            if _threads_users == 0:
+                cv.setNumThreads(_threads_saved)
+
+
+def grid_for_workers(shape, workers):
+    """Return (cols, rows) giving about one tile per worker, following the frame's aspect ratio."""
+    h, w = shape[:2]
+    rows = max(1, int(round(np.sqrt(workers * h / float(w)))))
+    cols = max(1, int(np.ceil(workers / float(rows))))
+    return cols, rows
+
+
+def tile_grid(shape, cols, rows, overlap):
+    """
+    Return (x, y, w, h) tiles splitting an image of `shape` into cols x rows
+    equally sized tiles that overlap their neighbours by `overlap` pixels.
+    """
+    h, w = shape[:2]
+
+    def spans(length, n):
+        size = min(length, int(np.ceil((length + (n - 1) * overlap) / float(n))))
+        if n == 1 or size >= length:
+            return [(0, length)]
+        return [(int(round(i * (length - size) / float(n - 1))), size) for i in range(n)]
+
+    return [(x, y, tw, th) for y, th in spans(h, rows) for x, tw in spans(w, cols)]
+
+
+def nms(boxes, iou_thresh=0.3, contain_thresh=0.7):
+    """
+    Greedy non-maximum suppression for (x, y, w, h) boxes without scores.
+
+    Larger boxes win. A box is dropped if its IoU with a kept box is above
+    `iou_thresh`, or if more than `contain_thresh` of its area lies inside a
+    kept box (partial detections clipped at a tile seam).
+
+    Returns:
+        np.ndarray: (N, 4) int32 array of kept boxes
+    """
+    boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+    if len(boxes) == 0:
+        return boxes
+    x1, y1 = boxes[:, 0].astype(np.float64), boxes[:, 1].astype(np.float64)
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    areas = boxes[:, 2].astype(np.float64) * boxes[:, 3]
+    order = np.argsort(-areas, kind='stable')
+
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        iou = inter / (areas[i] + areas[rest] - inter)
+        contained = inter / areas[rest]
+        order = rest[(iou <= iou_thresh) & (contained <= contain_thresh)]
+    return boxes[keep]
+
+
+class TiledDetector:
+    """
+    Run a Haar cascade over overlapping tiles of a frame in parallel.
+
+    Args:
+        cascade_path (str): path of the cascade XML file
+        max_object (int): largest expected object size in pixels (sets the tile overlap)
+        grid (tuple, optional): (cols, rows) of tiles (default: about one tile per worker)
+        workers (int, optional): thread pool size (default: CPU count)
+    """
+
+    def __init__(self, cascade_path, max_object=256, grid=None, workers=None):
+        if not os.path.exists(cascade_path):
+            raise FileNotFoundError(f"Haar cascade not found: {cascade_path}")
+        self.cascade_path = cascade_path
+        self.max_object = max_object
+        self.grid = grid
+        self.workers = workers or os.cpu_count() or 1
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+
+    def _cascade(self):
+        cas = getattr(self._local, 'cascade', None)
+        if cas is None:
+            cas = cv.CascadeClassifier(self.cascade_path)
+            self._local.cascade = cas
+        return cas
+
+    def _detect_tile(self, gray, tile, scale_factor, min_neighbors, min_size):
+        x, y, w, h = tile
+        found = self._cascade().detectMultiScale(gray[y:y + h, x:x + w], scale_factor, min_neighbors,
+                                                 minSize=min_size,
+                                                 maxSize=(self.max_object, self.max_object))
+        if len(found) == 0:
+            return np.zeros((0, 4), np.int32)
+        return np.asarray(found, np.int32) + np.array([x, y, 0, 0], np.int32)
+
+    def detect(self, gray, scale_factor=1.1, min_neighbors=4, min_size=(0, 0), iou_thresh=0.3):
+        """
+        Detect objects in a grayscale frame.
+
+        Returns:
+            np.ndarray: (N, 4) int32 array of (x, y, w, h) boxes in frame coordinates
+        """
+        cols, rows = self.grid or grid_for_workers(gray.shape, self.workers)
+        tiles = tile_grid(gray.shape, cols, rows, self.max_object)
+        with _opencv_single_threaded():
+            futures = [self._pool.submit(self._detect_tile, gray, t, scale_factor, min_neighbors, min_size)
+                       for t in tiles]
+            boxes = np.concatenate([f.result() for f in futures])
+        if len(tiles) == 1:
+            return boxes
+        return nms(boxes, iou_thresh)
+
+    # drop-in for CascadeClassifier, so detect_faces() / detect_plates() accept a TiledDetector
+    detectMultiScale = detect
+
+    def close(self):
+        """Shut down the worker threads."""
+        self._pool.shutdown()
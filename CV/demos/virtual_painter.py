@@ -7,10 +7,17 @@ Features:
 - Detect colors using predefined HSV ranges
 - Track positions of colored objects
 - Draw on screen following object movements
+- Per-frame images (result, HSV, mask) come from a reusable buffer pool
+- Tracking mode: each marker is searched only inside a window around its last
+  position; a marker that leaves its window is looked for on a downscaled frame
+  right away, and every few frames while it stays lost
 
 Run:
     python virtual_painter.py
 
+Notes:
+    - Press 't' to toggle tracking mode, 'q' to quit.
+
 Requirements:
     - OpenCV (cv2)
     - numpy
@@ -19,6 +26,8 @@ Requirements:
 import cv2 as cv
 import numpy as np
 
+from frame_buffers import BufferPool
+
 # Predefined color ranges in HSV and BGR for drawing
 myclr = [
     [35, 64, 0, 94, 255, 255],  # green
@@ -55,13 +64,15 @@ def get_highest_contours(img):
     return x, y
 
 
-def color_detect(frame, myclr, myclrvals, img_result):
+def color_detect(frame, myclr, myclrvals, img_result, hsv=None, mask=None):
+    """Detect each color marker; `hsv` and `mask` are optional preallocated outputs."""
     new_points = []
-    imgHSV = cv.cvtColor(frame, cv.COLOR_BGR2HSV)
+    imgHSV = cv.cvtColor(frame, cv.COLOR_BGR2HSV, dst=hsv)
     for idx, clr in enumerate(myclr):
         lower = np.array(clr[:3])
         upper = np.array(clr[3:6])
-        mask = cv.inRange(imgHSV, lower, upper)
+        # the same mask buffer is reused for every color
+        mask = cv.inRange(imgHSV, lower, upper, dst=mask)
         x, y = get_highest_contours(mask)
         if x != 0 and y != 0:
             cv.circle(img_result, (x, y), 10, myclrvals[idx], cv.FILLED)
@@ -69,6 +80,119 @@ def color_detect(frame, myclr, myclrvals, img_result):
     return new_points
 
 
+class MarkerTracker:
+    """
+    Search-window tracker for the color markers.
+
+    Each color keeps a window around its last blob. HSV conversion, thresholding
+    and contour extraction run only inside that window, so the cost per frame
+    scales with the marker size instead of the frame size. After every hit the
+    window is re-centred on the blob's bounding box and resized to it plus
+    `margin` (a plain bounding-box re-centre, not mean-shift).
+
+    A marker missing from its window (e.g. moved more than `margin` pixels) is
+    searched for in the same frame on a copy downscaled by `reacquire_scale`; a
+    hit there seeds a window that is then searched at full resolution. Markers
+    that stay lost are only searched every `reacquire_every` frames, counted
+    per color, so one absent color doesn't cost a search on every frame.
+
+    Args:
+        colors (list): HSV ranges, same layout as `myclr`
+        margin (int): pixels added around the blob for the next search window
+        min_area (int): smallest contour area accepted as a marker
+        reacquire_every (int): frames between searches for a marker that stays lost
+        reacquire_scale (float): downscale factor of the reacquisition search
+    """
+
+    def __init__(self, colors, margin=40, min_area=1000, reacquire_every=10, reacquire_scale=0.25):
+        self.colors = colors
+        self.margin = margin
+        self.min_area = min_area
+        self.reacquire_every = reacquire_every
+        self.reacquire_scale = reacquire_scale
+        self.windows = [None] * len(colors)
+        self.lost_frames = [0] * len(colors)  # consecutive frames each marker has been lost
+        self.window_searches = 0
+        self.reacquire_searches = 0
+
+    def reset(self):
+        """Forget all windows; the next update() searches for every marker."""
+        self.windows = [None] * len(self.colors)
+        self.lost_frames = [0] * len(self.colors)
+
+    def _find_blob(self, hsv, idx, offset=(0, 0), min_area=None):
+        """Return the bounding box of the largest blob of color `idx`, or None."""
+        clr = self.colors[idx]
+        mask = cv.inRange(hsv, np.array(clr[:3]), np.array(clr[3:6]))
+        contours, _ = cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_NONE, offset=offset)
+        best, best_area = None, self.min_area if min_area is None else min_area
+        for cnt in contours:
+            area = cv.contourArea(cnt)
+            if area > best_area:
+                best, best_area = cnt, area
+        if best is None:
+            return None
+        peri = cv.arcLength(best, True)
+        approx = cv.approxPolyDP(best, 0.02 * peri, True)
+        return cv.boundingRect(approx)
+
+    def _window_around(self, box, shape):
+        x, y, w, h = box
+        x0, y0 = max(0, x - self.margin), max(0, y - self.margin)
+        x1, y1 = min(shape[1], x + w + self.margin), min(shape[0], y + h + self.margin)
+        return x0, y0, x1 - x0, y1 - y0
+
+    def _search_window(self, frame, idx):
+        x, y, w, h = self.windows[idx]
+        roi_hsv = cv.cvtColor(frame[y:y + h, x:x + w], cv.COLOR_BGR2HSV)
+        self.window_searches += 1
+        return self._find_blob(roi_hsv, idx, offset=(x, y))
+
+    def update(self, frame):
+        """
+        Locate every marker in `frame`.
+
+        Returns:
+            list of [x, y, idx] points, same format as color_detect()
+        """
+        points = []
+        small_hsv = None
+        s = self.reacquire_scale
+        for idx in range(len(self.colors)):
+            box = self._search_window(frame, idx) if self.windows[idx] is not None else None
+            if box is None and self.lost_frames[idx] % self.reacquire_every == 0:
+                # just lost (or lost for another reacquire_every frames): coarse search on a
+                # downscaled frame, converted at most once per update()
+                if small_hsv is None:
+                    small = cv.resize(frame, None, fx=s, fy=s, interpolation=cv.INTER_AREA)
+                    small_hsv = cv.cvtColor(small, cv.COLOR_BGR2HSV)
+                coarse = self._find_blob(small_hsv, idx, min_area=self.min_area * s * s)
+                self.reacquire_searches += 1
+                if coarse is not None:
+                    # seed a window from the coarse box, then locate the marker at full resolution
+                    cx, cy, cw, ch = coarse
+                    self.windows[idx] = self._window_around(
+                        (int(cx / s), int(cy / s), int(np.ceil(cw / s)), int(np.ceil(ch / s))), frame.shape)
+                    box = self._search_window(frame, idx)
+            if box is None:
+                self.windows[idx] = None
+                self.lost_frames[idx] += 1
+                continue
+            self.lost_frames[idx] = 0
+            self.windows[idx] = self._window_around(box, frame.shape)
+            bx, by, bw, bh = box
+            points.append([bx + bw // 2, by, idx])
+        return points
+
+
+def track_detect(frame, tracker, myclrvals, img_result):
+    """Tracking-mode counterpart of color_detect()."""
+    new_points = tracker.update(frame)
+    for x, y, idx in new_points:
+        cv.circle(img_result, (x, y), 10, myclrvals[idx], cv.FILLED)
+    return new_points
+
+
 def draw_on_canvas(points, myclrvals, img_result):
     for point in points:
         cv.circle(img_result, (point[0], point[1]), 10, myclrvals[point[2]], cv.FILLED)
@@ -76,17 +200,28 @@ def draw_on_canvas(points, myclrvals, img_result):
 
 def run_demo():
     cam = get_webcam()
+    pool = BufferPool()
+    tracker = MarkerTracker(myclr)
+    tracking = True
+    frame = None
 
-    print("Virtual Painter Demo: Press 'q' to quit")
+    print("Virtual Painter Demo: Press 't' to toggle tracking, 'q' to quit")
 
     while True:
-        success, frame = cam.read()
+        pool.begin_frame()
+        # passing the previous frame lets VideoCapture decode into the same buffer
+        success, frame = cam.read(frame)
         if not success:
             print("Error reading webcam")
             break
 
-        img_result = frame.copy()
-        new_points = color_detect(frame, myclr, myclrvals, img_result)
+        img_result = pool.copy_into('result', frame)
+        if tracking:
+            new_points = track_detect(frame, tracker, myclrvals, img_result)
+        else:
+            new_points = color_detect(frame, myclr, myclrvals, img_result,
+                                      hsv=pool.like('hsv', frame),
+                                      mask=pool.get('mask', frame.shape[:2]))
 
         if new_points:
             for p in new_points:
@@ -96,10 +231,18 @@ def run_demo():
             draw_on_canvas(mypnts, myclrvals, img_result)
 
         cv.imshow("Virtual Painter", img_result)
+        pool.end_frame()
 
-        if cv.waitKey(1) & 0xFF == ord('q'):
+        key = cv.waitKey(1) & 0xFF
+        if key == ord('q'):
             break
+        elif key == ord('t'):
+            tracking = not tracking
+            tracker.reset()
+            print('Tracking', 'on' if tracking else 'off')
 
+    print(pool.format_stats())
+    print(f"[tracker] window searches={tracker.window_searches} reacquire searches={tracker.reacquire_searches}")
     cam.release()
     cv.destroyAllWindows()
 